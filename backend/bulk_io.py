@@ -0,0 +1,396 @@
+import codecs
+import json
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+READ_CHUNK_SIZE = 64 * 1024
+WRITE_CHUNK_SIZE = 500  # profiles per buffered write during a merge
+MAX_REPORTED_ERRORS = 50
+MAX_ITEM_SIZE = 16 * 1024 * 1024  # characters buffered for a single, not yet complete item
+
+_WS = " \t\r\n"
+# Characters a scalar (number / true / false / null) cut at a chunk boundary can end with
+_PARTIAL_SCALAR_CHARS = set("0123456789+-.eEtrufalsn")
+
+
+# ---------------------------
+# Incremental parsing
+# ---------------------------
+class JsonStreamParser:
+    """
+    Push parser for a stream of JSON values, either a top-level JSON array
+    ("[{...}, {...}]") or NDJSON (one value per line). The format is detected from
+    the first non-whitespace character. Only the current, not yet complete value is
+    buffered (at most MAX_ITEM_SIZE characters), and invalid input is reported as soon
+    as it is seen rather than at close().
+
+        parser = JsonStreamParser()
+        for chunk in chunks:
+            for value in parser.feed(chunk): ...
+        parser.close()
+    """
+
+    def __init__(self, max_item_size: int = MAX_ITEM_SIZE):
+        self.max_item_size = max_item_size
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._mode: Optional[str] = None  # "array" | "ndjson"
+        self._expect = "first"  # array mode: "first" (value or ']'), "value", "sep" (',' or ']')
+        self._done = False
+        self.line = 1  # NDJSON line (or array item) number of the next value
+
+    def feed(self, data) -> List[Any]:
+        if isinstance(data, bytes):
+            data = self._utf8.decode(data)
+        self._buf += data
+        return self._drain(final=False)
+
+    def close(self) -> List[Any]:
+        self._buf += self._utf8.decode(b"", final=True)
+        values = self._drain(final=True)
+        if self._mode == "array" and not self._done:
+            raise ValueError("Unterminated JSON array")
+        return values
+
+    def _drain(self, final: bool) -> List[Any]:
+        values: List[Any] = []
+        while True:
+            if self._mode is None:
+                self._buf = self._buf.lstrip(_WS)
+                if not self._buf:
+                    return values
+                if self._buf[0] == "[":
+                    self._mode = "array"
+                    self._buf = self._buf[1:]
+                else:
+                    self._mode = "ndjson"
+
+            if self._mode == "ndjson":
+                nl = self._buf.find("\n")
+                if nl < 0:
+                    if not final:
+                        self._check_size()
+                        return values
+                    line, self._buf = self._buf, ""
+                else:
+                    line, self._buf = self._buf[:nl], self._buf[nl + 1 :]
+                lineno = self.line
+                self.line += 1
+                if line.strip():
+                    try:
+                        values.append(json.loads(line))
+                    except json.JSONDecodeError as e:
+                        raise ValueError(f"line {lineno}: {e.msg}")
+                if nl < 0:
+                    return values
+                continue
+
+            # array mode
+            if self._done:
+                if self._buf.strip(_WS):
+                    raise ValueError("Unexpected data after JSON array")
+                self._buf = ""
+                return values
+            self._buf = self._buf.lstrip(_WS)
+            if not self._buf:
+                return values
+            ch = self._buf[0]
+            if self._expect == "sep":
+                if ch == ",":
+                    self._expect = "value"
+                elif ch == "]":
+                    self._done = True
+                else:
+                    raise ValueError(f"item {self.line}: expected ',' or ']' between items")
+                self._buf = self._buf[1:]
+                continue
+            if ch == "]":
+                if self._expect != "first":
+                    raise ValueError(f"item {self.line}: trailing ',' before ']'")
+                self._done = True
+                self._buf = self._buf[1:]
+                continue
+            if ch == ",":
+                raise ValueError(f"item {self.line}: missing value before ','")
+            try:
+                value, end = self._decoder.raw_decode(self._buf)
+            except json.JSONDecodeError as e:
+                if final or not self._may_continue(e):
+                    raise ValueError(f"item {self.line}: {e.msg}")
+                self._check_size()
+                return values  # value not complete yet, wait for more data
+            if end == len(self._buf) and not final:
+                self._check_size()
+                return values  # a scalar cut at the chunk boundary may continue ("1" + "23")
+            values.append(value)
+            self.line += 1
+            self._expect = "sep"
+            self._buf = self._buf[end:]
+
+
+    def _may_continue(self, e: json.JSONDecodeError) -> bool:
+        """True if the decode error can be explained by the input ending early."""
+        if e.msg.startswith("Unterminated string"):
+            return True
+        if e.msg.startswith("Invalid \\uXXXX escape"):
+            return len(self._buf) - e.pos < 6
+        tail = self._buf[e.pos:].lstrip(_WS)
+        return len(tail) < 32 and all(c in _PARTIAL_SCALAR_CHARS for c in tail)
+
+    def _check_size(self) -> None:
+        if len(self._buf) > self.max_item_size:
+            raise ValueError(f"item {self.line}: exceeds {self.max_item_size} characters")
+
+
+def iter_json_file(path: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    """Stream the items of a JSON array (or NDJSON) file without loading it whole."""
+    if not os.path.exists(path):
+        return
+    parser = JsonStreamParser()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+def iter_json_snapshot(path: str) -> Iterator[Any]:
+    """
+    Like iter_json_file, but copies the file to a private temp file first, so the
+    store is not held open while a slow consumer (e.g. an HTTP export) reads.
+    On Windows an open handle would make os.replace of the store fail.
+    """
+    if not os.path.exists(path):
+        return
+    with tempfile.TemporaryFile(mode="w+b") as snap:
+        with open(path, "rb") as f:
+            shutil.copyfileobj(f, snap, READ_CHUNK_SIZE)
+        snap.seek(0)
+        parser = JsonStreamParser()
+        while True:
+            chunk = snap.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield from parser.feed(chunk)
+        yield from parser.close()
+
+
+def replace_file(tmp_path: str, path: str, retries: int = 5, delay: float = 0.1) -> None:
+    """
+    os.replace with a few retries: on Windows it fails with PermissionError while
+    another handle (a reader) has the target open. The temp file is removed if it
+    still fails.
+    """
+    for attempt in range(retries):
+        try:
+            os.replace(tmp_path, path)
+            return
+        except PermissionError:
+            if attempt < retries - 1:
+                time.sleep(delay * (attempt + 1))
+                continue
+            remove_quietly(tmp_path)
+            raise
+        except OSError:
+            remove_quietly(tmp_path)
+            raise
+
+
+def remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# ---------------------------
+# Streaming output
+# ---------------------------
+def _array_item(obj: Any) -> str:
+    # Same layout as json.dump(list, indent=2) in main.save_profiles
+    text = json.dumps(obj, indent=2, ensure_ascii=False)
+    return "  " + text.replace("\n", "\n  ")
+
+
+def iter_json_array_text(items: Iterable[Any]) -> Iterator[str]:
+    first = True
+    for item in items:
+        yield ("[\n" if first else ",\n") + _array_item(item)
+        first = False
+    yield "[]" if first else "\n]"
+
+
+def iter_ndjson_text(items: Iterable[Any]) -> Iterator[str]:
+    for item in items:
+        yield json.dumps(item, ensure_ascii=False) + "\n"
+
+
+# ---------------------------
+# Import: spool -> merge
+# ---------------------------
+class ProfileSpool:
+    """
+    Validated incoming profiles, kept in a temporary NDJSON file.
+    Only sw_package_id -> (offset, length) stays in memory; a repeated id keeps the last record.
+    """
+
+    def __init__(self):
+        self._file = tempfile.TemporaryFile(mode="w+b")
+        self.offsets: Dict[str, Tuple[int, int]] = {}
+        self.errors: List[Dict] = []
+        self.error_count = 0
+        self.received = 0
+
+    def add(self, profile: Any, item_no: int) -> None:
+        self.received += 1
+        error = validate_profile(profile)
+        if error:
+            self.error_count += 1
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append({"item": item_no, "error": error})
+            return
+        data = (json.dumps(profile, ensure_ascii=False) + "\n").encode("utf-8")
+        self._file.seek(0, os.SEEK_END)
+        self.offsets[str(profile["sw_package_id"])] = (self._file.tell(), len(data))
+        self._file.write(data)
+
+    def error(self, item_no: int, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"item": item_no, "error": message})
+
+    def get(self, pid: str) -> Dict:
+        offset, length = self.offsets[pid]
+        self._file.seek(offset)
+        return json.loads(self._file.read(length).decode("utf-8"))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def validate_profile(profile: Any) -> Optional[str]:
+    if not isinstance(profile, dict):
+        return "profile must be a JSON object"
+    pid = profile.get("sw_package_id")
+    if pid is None or str(pid).strip() == "":
+        return "sw_package_id is required"
+    if isinstance(pid, (dict, list)):
+        return "sw_package_id must be a number or string"
+    for key in ("source_references", "artifacts", "swad", "swdd"):
+        if key in profile and profile[key] is not None and not isinstance(profile[key], list):
+            return f"{key} must be a list"
+    gpm = profile.get("generic_product_module")
+    if gpm is not None and not isinstance(gpm, dict):
+        return "generic_product_module must be an object"
+    for i, a in enumerate(profile.get("artifacts") or []):
+        if not isinstance(a, dict):
+            return f"artifacts[{i}] must be an object"
+    for i, ref in enumerate(profile.get("source_references") or []):
+        where = f"source_references[{i}]"
+        if not isinstance(ref, dict):
+            return f"{where} must be an object"
+        for key in ("components", "additional_information"):
+            items = ref.get(key)
+            if items is None:
+                continue
+            if not isinstance(items, list):
+                return f"{where}.{key} must be a list"
+            for j, item in enumerate(items):
+                if not isinstance(item, dict):
+                    return f"{where}.{key}[{j}] must be an object"
+        cl = ref.get("change_log")
+        if cl is not None and not isinstance(cl, dict):
+            return f"{where}.change_log must be an object"
+    return None
+
+
+def _changed_fields(old: Dict, new: Dict) -> List[str]:
+    return sorted(k for k in set(old) | set(new) if old.get(k) != new.get(k))
+
+
+def merge_profiles(
+    store_path: str,
+    spool: ProfileSpool,
+    dry_run: bool = False,
+) -> Dict[str, Any]:
+    """
+    Upsert the spooled profiles into the JSON array at store_path.
+
+    The store is streamed item by item into a temporary file next to it, which
+    replaces the original atomically at the end, so readers see either the old or
+    the new store. With dry_run nothing is written and only the diff is returned.
+    Callers that mirror the store (e.g. the profile index) should apply
+    created/updated ids from the summary only after this returns.
+    """
+    created: List[Any] = []
+    updated: List[Dict] = []
+    unchanged: List[Any] = []
+    pending = set(spool.offsets)
+
+    tmp_path = f"{store_path}.bulk.tmp"
+    out = None if dry_run else open(tmp_path, "w", encoding="utf-8")
+    batch: List[str] = []
+    first = True
+
+    def emit(profile: Dict) -> None:
+        nonlocal first
+        batch.append(("[\n" if first else ",\n") + _array_item(profile))
+        first = False
+        if len(batch) >= WRITE_CHUNK_SIZE:
+            flush()
+
+    def flush() -> None:
+        if out is not None and batch:
+            out.write("".join(batch))
+        batch.clear()
+
+    # A dry run takes no writer lock, so read a snapshot instead of holding the store open
+    source = iter_json_snapshot(store_path) if dry_run else iter_json_file(store_path)
+    try:
+        for existing in source:
+            pid = str(existing.get("sw_package_id"))
+            if pid in pending:
+                pending.discard(pid)
+                incoming = spool.get(pid)
+                changes = _changed_fields(existing, incoming)
+                if changes:
+                    updated.append({"sw_package_id": incoming.get("sw_package_id"), "changed_fields": changes})
+                else:
+                    unchanged.append(incoming.get("sw_package_id"))
+                emit(incoming)
+            else:
+                emit(existing)
+
+        # New profiles keep their order of arrival
+        for pid, _ in sorted(((p, spool.offsets[p]) for p in pending), key=lambda x: x[1][0]):
+            incoming = spool.get(pid)
+            created.append(incoming.get("sw_package_id"))
+            emit(incoming)
+
+        batch.append("[]" if first else "\n]")
+        flush()
+
+        if out is not None:
+            out.flush()
+            os.fsync(out.fileno())
+            out.close()
+            out = None
+            replace_file(tmp_path, store_path)
+    finally:
+        if out is not None:
+            out.close()
+            remove_quietly(tmp_path)
+
+    return {
+        "dry_run": dry_run,
+        "received": spool.received,
+        "created": created,
+        "updated": updated,
+        "unchanged": unchanged,
+    }
@@ -1,14 +1,29 @@
 # backend/main.py  — refactored & ready to paste
 
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import FastAPI, Request, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from carweaver_client import CarWeaver
 from gerrit_client import GerritClient
 from artifactory_client import ArtifactoryClient
+from prewarm import ResolutionCache, TagPoller, parse_ref_updated_event
+from profile_index import INDEX_FIELDS, ProfileIndex, profile_projects
+from bulk_io import (
+    JsonStreamParser,
+    ProfileSpool,
+    iter_json_array_text,
+    iter_json_snapshot,
+    iter_ndjson_text,
+    merge_profiles,
+    remove_quietly,
+    replace_file,
+)
 import json
 import os
+import threading
 import requests
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 app = FastAPI()
 app.add_middleware(
@@ -31,9 +46,42 @@ def load_profiles() -> List[Dict]:
         return json.load(f)
 
 
-def save_profiles(profiles: List[Dict]) -> None:
-    with open(PROFILE_FILE, "w", encoding="utf-8") as f:
-        json.dump(profiles, f, indent=2, ensure_ascii=False)
+# Serializes writers of PROFILE_FILE. Held across load -> modify -> save -> index update,
+# re-entered by save_profiles. Never take it on the event loop (use run_in_threadpool).
+profiles_write_lock = threading.RLock()
+
+
+def save_profiles(profiles: List[Dict], index_update: Optional[Callable[[], None]] = None) -> None:
+    """
+    Write the whole store. index_update applies the matching profile_index change
+    in the same critical section, so file and index cannot drift apart.
+    """
+    with profiles_write_lock:
+        # Only a fresh index may adopt the new file state; a stale one rebuilds on next query
+        was_fresh = profile_index.is_fresh()
+        tmp_path = f"{PROFILE_FILE}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(profiles, f, indent=2, ensure_ascii=False)
+        except Exception:
+            remove_quietly(tmp_path)
+            raise
+        # Readers never see a half-written file; retried while a Windows reader holds it open
+        replace_file(tmp_path, PROFILE_FILE)
+        try:
+            if index_update:
+                index_update()
+        except Exception as e:
+            # The write is committed; let the next query rebuild the index instead of failing it
+            print(f"[profile_index] update failed, will rebuild: {e}")
+            profile_index.invalidate()
+            return
+        if was_fresh:
+            profile_index.mark_synced()
+
+
+# Reverse index: Gerrit project / CarWeaver ids -> profiles
+profile_index = ProfileIndex(PROFILE_FILE, load_profiles)
 
 
 def _index_by_id(profiles: List[Dict], sw_package_id) -> int:
@@ -43,6 +91,25 @@ def _index_by_id(profiles: List[Dict], sw_package_id) -> int:
     return -1
 
 
+def _upsert_profile(profile: Dict, sw_package_id) -> str:
+    """Replace the profile stored under sw_package_id, or append it. Returns the mode."""
+    with profiles_write_lock:
+        profiles = load_profiles()
+        idx = _index_by_id(profiles, sw_package_id)
+        if idx >= 0:
+            profiles[idx] = profile
+
+            def reindex():
+                profile_index.remove(sw_package_id)  # body may carry a different id
+                profile_index.upsert(profile)
+
+            save_profiles(profiles, reindex)
+            return "updated"
+        profiles.append(profile)
+        save_profiles(profiles, lambda: profile_index.upsert(profile))
+        return "created"
+
+
 # ---------------------------
 # Profiles CRUD
 # ---------------------------
@@ -61,23 +128,15 @@ async def create_or_replace_profiles(request: Request):
     body = await request.json()
 
     if isinstance(body, list):
-        save_profiles(body)
+        await run_in_threadpool(save_profiles, body, lambda: profile_index.rebuild(body))
         return {"success": True, "mode": "replaced_all"}
 
     profile = body
     if "sw_package_id" not in profile:
         raise HTTPException(status_code=400, detail="sw_package_id is required")
 
-    profiles = load_profiles()
-    idx = _index_by_id(profiles, profile["sw_package_id"])
-    if idx >= 0:
-        profiles[idx] = profile
-        save_profiles(profiles)
-        return {"success": True, "mode": "updated"}
-    else:
-        profiles.append(profile)
-        save_profiles(profiles)
-        return {"success": True, "mode": "created"}
+    mode = await run_in_threadpool(_upsert_profile, profile, profile["sw_package_id"])
+    return {"success": True, "mode": mode}
 
 
 @app.put("/api/profiles/{sw_package_id}")
@@ -86,29 +145,156 @@ async def update_profile(sw_package_id: str, request: Request):
     if "sw_package_id" not in incoming:
         incoming["sw_package_id"] = int(sw_package_id) if sw_package_id.isdigit() else sw_package_id
 
-    profiles = load_profiles()
-    idx = _index_by_id(profiles, sw_package_id)
-    if idx >= 0:
-        profiles[idx] = incoming
-        save_profiles(profiles)
-        return {"success": True, "mode": "updated"}
-    else:
-        profiles.append(incoming)
-        save_profiles(profiles)
-        return {"success": True, "mode": "created"}
+    mode = await run_in_threadpool(_upsert_profile, incoming, sw_package_id)
+    return {"success": True, "mode": mode}
 
 
 @app.delete("/api/profiles/{sw_package_id}")
 def delete_profile(sw_package_id: str):
-    profiles = load_profiles()
-    idx = _index_by_id(profiles, sw_package_id)
-    if idx < 0:
-        raise HTTPException(status_code=404, detail="Profile not found")
-    profiles.pop(idx)
-    save_profiles(profiles)
+    with profiles_write_lock:
+        profiles = load_profiles()
+        idx = _index_by_id(profiles, sw_package_id)
+        if idx < 0:
+            raise HTTPException(status_code=404, detail="Profile not found")
+        profiles.pop(idx)
+        save_profiles(profiles, lambda: profile_index.remove(sw_package_id))
     return {"success": True, "mode": "deleted"}
 
 
+# ---------------------------
+# Bulk import / export (streaming)
+# ---------------------------
+def _commit_bulk_import(spool: ProfileSpool, dry_run: bool) -> Dict[str, Any]:
+    if dry_run:
+        # Read-only; the store is only ever swapped atomically, so no writer lock needed
+        return merge_profiles(PROFILE_FILE, spool, dry_run=True)
+
+    with profiles_write_lock:
+        was_fresh = profile_index.is_fresh()
+        summary = merge_profiles(PROFILE_FILE, spool)  # on failure the store is untouched
+        # The store is committed now; index only what actually landed in it
+        try:
+            for pid in summary["created"] + [u["sw_package_id"] for u in summary["updated"]]:
+                profile_index.upsert(spool.get(str(pid)))
+        except Exception as e:
+            print(f"[profile_index] bulk update failed, will rebuild: {e}")
+            profile_index.invalidate()
+            return summary
+        if was_fresh:
+            profile_index.mark_synced()
+    return summary
+
+
+@app.post("/api/profiles/bulk")
+async def bulk_import_profiles(request: Request, dry_run: bool = False):
+    """
+    Streaming upsert of many profiles. Body is NDJSON (one profile per line) or a JSON array.
+    All profiles are validated first; if any is invalid nothing is written.
+    With ?dry_run=true the store is left untouched and the diff
+    (created / updated with changed_fields / unchanged) is returned.
+    """
+    parser = JsonStreamParser()
+    spool = ProfileSpool()
+    try:
+        try:
+            async for chunk in request.stream():
+                for profile in parser.feed(chunk):
+                    spool.add(profile, spool.received + 1)
+            for profile in parser.close():
+                spool.add(profile, spool.received + 1)
+        except ValueError as e:
+            spool.error(parser.line, str(e))
+
+        if spool.error_count:
+            raise HTTPException(
+                status_code=400,
+                detail={"received": spool.received, "error_count": spool.error_count, "errors": spool.errors},
+            )
+
+        summary = await run_in_threadpool(_commit_bulk_import, spool, dry_run)
+        return {"success": True, "mode": "dry_run" if dry_run else "bulk_upserted", **summary}
+    finally:
+        spool.close()
+
+
+def _stream_response(items, fmt: str, filename: str) -> StreamingResponse:
+    if fmt == "ndjson":
+        body, media_type = iter_ndjson_text(items), "application/x-ndjson"
+    elif fmt == "json":
+        body, media_type = iter_json_array_text(items), "application/json"
+    else:
+        raise HTTPException(status_code=400, detail="format must be 'ndjson' or 'json'")
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
+
+
+@app.get("/api/profiles/export")
+def export_profiles(format: str = "ndjson"):
+    """Streams all profiles (NDJSON by default, or ?format=json) from a snapshot of the store."""
+    return _stream_response(iter_json_snapshot(PROFILE_FILE), format, "profiles")
+
+
+def _iter_manifests(sw_version: str, ids: List[str], g: GerritClient, af: ArtifactoryClient):
+    wanted = set(ids)
+    # Snapshot: each profile needs Gerrit/Artifactory round trips, don't hold the store open meanwhile
+    for profile in iter_json_snapshot(PROFILE_FILE):
+        if wanted and str(profile.get("sw_package_id")) not in wanted:
+            continue
+        try:
+            yield _generate_manifest(profile, sw_version, g, af)
+        except Exception as e:
+            yield {"sw_package_id": profile.get("sw_package_id"), "sw_version": sw_version, "error": str(e)}
+
+
+@app.get("/api/generate/swlm/export")
+def export_manifests(sw_version: str, ids: str = "", format: str = "ndjson"):
+    """
+    Streams generated manifests for all profiles, or for ?ids=175,176 only.
+    Profiles that fail to generate are emitted as {sw_package_id, sw_version, error}.
+    """
+    id_list = [i.strip() for i in ids.split(",") if i.strip()]
+    g = GerritClient()
+    af = ArtifactoryClient(repo=os.getenv("ARTIFACTORY_REPO", "ARTBC-SUM-LTS"))
+    return _stream_response(_iter_manifests(sw_version, id_list, g, af), format, f"manifests_{sw_version}")
+
+
+# ---------------------------
+# Profile reverse lookups
+# ---------------------------
+def _profiles_by(field: str, value: str):
+    value = (value or "").strip()
+    if not value:
+        raise HTTPException(status_code=400, detail=f"{INDEX_FIELDS[field]} is required")
+    return {field: value, "profiles": profile_index.lookup(field, value)}
+
+
+@app.get("/api/profiles/by_project")
+def profiles_by_project(project: str):
+    """GET /api/profiles/by_project?project=SWComponents/LevelingControl"""
+    return _profiles_by("project", project)
+
+
+@app.get("/api/profiles/by_component")
+def profiles_by_component(id: str):
+    """GET /api/profiles/by_component?id=C-9872"""
+    return _profiles_by("component_id", id)
+
+
+@app.get("/api/profiles/by_persistent_id")
+def profiles_by_persistent_id(id: str):
+    """GET /api/profiles/by_persistent_id?id=C-23434"""
+    return _profiles_by("persistent_id", id)
+
+
+@app.get("/api/profiles/by_gpm")
+def profiles_by_gpm(id: str):
+    """GET /api/profiles/by_gpm?id=GPM-2"""
+    return _profiles_by("gpm_id", id)
+
+
 # ---------------------------
 # Helper utilities
 # ---------------------------
@@ -146,15 +332,27 @@ def _renumber_source_references(refs: List[Dict]) -> List[Dict]:
     return [{**r, "idx": i + 1} for i, r in enumerate(refs or [])]
 
 
-def _resolve_gerrit_tag_url(project: str, tag: str, g: GerritClient) -> str:
+# Shared by generation, helper endpoints and the pre-warmer
+resolution_cache = ResolutionCache(ttl=float(os.getenv("RESOLVE_CACHE_TTL", "3600")))
+
+
+def _resolve_gerrit_tag_url(project: str, tag: str, g: GerritClient, refresh: bool = False) -> str:
+    """refresh=True skips the cache read and overwrites the entry (used by the pre-warmer)."""
     project = (project or "").strip()
     if not project:
         return ""
+    key = ("gerrit", project, tag)
+    cached = None if refresh else resolution_cache.get(key)
+    if cached:
+        return cached
     try:
         url = g.get_tag_url_by_exact_name(project, tag)
-        return url or project  # fall back to project string if tag not found
     except Exception:
         return project
+    if not url:
+        return project  # fall back to project string if tag not found
+    resolution_cache.set(key, url)
+    return url
 
 
 # Map artifact menu names -> Artifactory AQL property sets
@@ -188,6 +386,24 @@ def _artifact_sha256_from_url(full_url: str, client: ArtifactoryClient) -> str:
     return (r.json().get("checksums") or {}).get("sha256", "") or ""
 
 
+def _resolve_artifact(name: str, sw_version: str, client: ArtifactoryClient, refresh: bool = False) -> Tuple[str, str]:
+    """
+    (location, sha256) for an artifact menu name, cached per sw_version.
+    refresh=True always asks Artifactory and overwrites the cached entry.
+    Raises if the artifact cannot be found.
+    """
+    key = ("artifact", name, sw_version)
+    cached = None if refresh else resolution_cache.get(key)
+    if cached:
+        return cached
+    props = _ARTIFACT_MAP[name]["props"](sw_version, _release_from_sw_version(sw_version))
+    url = client.find_artifact_by_properties(props)
+    sha = _artifact_sha256_from_url(url, client)
+    if sha:
+        resolution_cache.set(key, (url, sha))
+    return url, sha
+
+
 # ---------------------------
 # CarWeaver bridge
 # ---------------------------
@@ -246,8 +462,11 @@ def get_generic_product_module(item_id: str):
 # ---------------------------
 @app.get("/api/gerrit/tag_url")
 def get_gerrit_tag_url(project: str, tag: str):
-    gc = GerritClient()
-    url = gc.get_tag_url_by_exact_name(project, tag)
+    url = resolution_cache.get(("gerrit", project, tag))
+    if not url:
+        url = GerritClient().get_tag_url_by_exact_name(project, tag)
+        if url:
+            resolution_cache.set(("gerrit", project, tag), url)
     if not url:
         raise HTTPException(status_code=404, detail="Tag URL not found")
     return {"url": url}
@@ -267,14 +486,11 @@ def resolve_artifact(name: str, sw_version: str):
     repo = os.getenv("ARTIFACTORY_REPO", "ARTBC-SUM-LTS")
     client = ArtifactoryClient(repo=repo)
 
-    release = _release_from_sw_version(sw_version)
     if name not in _ARTIFACT_MAP:
         raise HTTPException(status_code=400, detail=f"Unknown artifact name: {name}")
 
     try:
-        props = _ARTIFACT_MAP[name]["props"](sw_version, release)
-        url = client.find_artifact_by_properties(props)
-        sha = _artifact_sha256_from_url(url, client)
+        url, sha = _resolve_artifact(name, sw_version, client)
         return {"location": url, "sha256": sha}
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -303,19 +519,23 @@ def generate_swlm(payload: Dict[str, Any]):
     if not sw_package_id or not sw_version:
         raise HTTPException(status_code=400, detail="sw_package_id and sw_version are required")
 
-    release = _release_from_sw_version(sw_version)
-
     # 1) Load profile by id
     profiles = load_profiles()
     match = next((p for p in profiles if str(p.get("sw_package_id")) == str(sw_package_id)), None)
     if not match:
         raise HTTPException(status_code=404, detail="Profile not found")
 
+    g = GerritClient()
+    af = ArtifactoryClient(repo=os.getenv("ARTIFACTORY_REPO", "ARTBC-SUM-LTS"))
+    return _generate_manifest(match, sw_version, g, af)
+
+
+def _generate_manifest(match: Dict, sw_version: str, g: GerritClient, af: ArtifactoryClient) -> Dict:
+    """Steps 2-5 of generate_swlm for an already loaded profile."""
     # 2) Fill missing versions
     profile_filled = _fill_versions(match, sw_version)
 
     # 3) Resolve Gerrit URLs
-    g = GerritClient()
     resolved_refs: List[Dict] = []
     for ref in profile_filled.get("source_references", []) or []:
         base_project = (ref.get("location") or "").strip()
@@ -353,17 +573,14 @@ def generate_swlm(payload: Dict[str, Any]):
     resolved_refs = _renumber_source_references(resolved_refs)
 
     # 4) Resolve Artifacts (location + sha256) using mapping -> Artifactory
-    af = ArtifactoryClient(repo=os.getenv("ARTIFACTORY_REPO", "ARTBC-SUM-LTS"))
     resolved_artifacts: List[Dict] = []
     for i, a in enumerate(profile_filled.get("artifacts", []) or []):
         name = (a.get("name") or "").strip()
         loc = ""
         sha = ""
         if name in _ARTIFACT_MAP:
-            props = _ARTIFACT_MAP[name]["props"](sw_version, release)
             try:
-                loc = af.find_artifact_by_properties(props)
-                sha = _artifact_sha256_from_url(loc, af)
+                loc, sha = _resolve_artifact(name, sw_version, af)
             except Exception as e:
                 # keep loc/sha empty on failure but continue
                 print(f"[artifacts] {name}: {e}")
@@ -397,6 +614,114 @@ def generate_swlm(payload: Dict[str, Any]):
     return result
 
 
+# ---------------------------
+# Pre-warming on new release tags
+# ---------------------------
+PREWARM_POLL_INTERVAL = float(os.getenv("PREWARM_POLL_INTERVAL", "0"))  # seconds, 0 = poller disabled
+PREWARM_TAG_PREFIX = os.getenv("PREWARM_TAG_PREFIX", "BSW_")
+
+
+def _prewarm_profile(profile: Dict, sw_version: str, g: GerritClient, af: Optional[ArtifactoryClient] = None) -> None:
+    """
+    Resolve everything generate_swlm needs for (profile, sw_version) into the cache.
+    Always refreshes: a moved tag or re-published artifact must replace the cached values.
+    """
+    for project in profile_projects(profile):
+        _resolve_gerrit_tag_url(project, sw_version, g, refresh=True)
+    if af is None:
+        return
+    for a in profile.get("artifacts", []) or []:
+        name = (a.get("name") or "").strip()
+        if name not in _ARTIFACT_MAP:
+            continue
+        try:
+            _resolve_artifact(name, sw_version, af, refresh=True)
+        except Exception as e:
+            print(f"[prewarm] artifact {name}@{sw_version}: {e}")
+
+
+def _prewarm_tag(project: str, tag: str) -> List:
+    """
+    Pre-resolve all profiles that reference `project` for the new `tag`.
+    Callers filter on PREWARM_TAG_PREFIX (the poller and the events endpoint).
+    """
+    ids = set(profile_index.lookup_ids("project", project))
+    if not ids:
+        return []
+    affected = [p for p in load_profiles() if str(p.get("sw_package_id")) in ids]
+    g = GerritClient()
+    try:
+        af = ArtifactoryClient(repo=os.getenv("ARTIFACTORY_REPO", "ARTBC-SUM-LTS"))
+    except Exception as e:
+        print(f"[prewarm] artifacts skipped: {e}")
+        af = None
+    for p in affected:
+        _prewarm_profile(p, tag, g, af)
+    warmed = [p.get("sw_package_id") for p in affected]
+    print(f"[prewarm] {project}@{tag}: warmed profiles {warmed}")
+    return warmed
+
+
+def _watched_projects() -> List[str]:
+    return profile_index.values("project")
+
+
+tag_poller = TagPoller(_watched_projects, _prewarm_tag, PREWARM_POLL_INTERVAL, PREWARM_TAG_PREFIX)
+
+
+@app.on_event("startup")
+def start_tag_poller():
+    if PREWARM_POLL_INTERVAL > 0:
+        tag_poller.start()
+
+
+@app.on_event("shutdown")
+def stop_tag_poller():
+    tag_poller.stop()
+
+
+@app.post("/api/prewarm/events")
+async def prewarm_events(request: Request, background_tasks: BackgroundTasks):
+    """
+    Gerrit 'ref-updated' event sink (webhook, or a local stream-events forwarder).
+    Accepts a single event object or a list of events; tag events are warmed in the background.
+    """
+    body = await request.json()
+    events = body if isinstance(body, list) else [body]
+    queued = []
+    for event in events:
+        parsed = parse_ref_updated_event(event)
+        if not parsed or not parsed[1].startswith(PREWARM_TAG_PREFIX):
+            continue
+        project, tag = parsed
+        background_tasks.add_task(_prewarm_tag, project, tag)
+        queued.append({"project": project, "tag": tag})
+    return {"success": True, "queued": queued}
+
+
+@app.post("/api/prewarm/poll")
+def prewarm_poll(background_tasks: BackgroundTasks):
+    """
+    Diff tags immediately (works even when the periodic poller is disabled);
+    new tags are warmed in the background.
+    """
+    new_tags = tag_poller.diff_once()
+    for project, tag in new_tags:
+        background_tasks.add_task(_prewarm_tag, project, tag)
+    return {"new_tags": [{"project": p, "tag": t} for p, t in new_tags]}
+
+
+@app.get("/api/prewarm/status")
+def prewarm_status():
+    return {
+        "poller_enabled": PREWARM_POLL_INTERVAL > 0,
+        "poller_alive": tag_poller.is_alive(),
+        "poll_interval": PREWARM_POLL_INTERVAL,
+        "tag_prefix": PREWARM_TAG_PREFIX,
+        "cache": resolution_cache.stats(),
+    }
+
+
 # ---------------------------
 # Root
 # ---------------------------
@@ -411,4 +736,20 @@ def root():
             "GET /api/carweaver/generic_product_module/{item_id}",
             "GET /api/carweaver/source_components/{item_id}",
         ],
+        "bulk": [
+            "POST /api/profiles/bulk[?dry_run=true] with NDJSON or a JSON array",
+            "GET /api/profiles/export?format=ndjson|json",
+            "GET /api/generate/swlm/export?sw_version=...&ids=...&format=ndjson|json",
+        ],
+        "lookups": [
+            "GET /api/profiles/by_project?project=...",
+            "GET /api/profiles/by_component?id=...",
+            "GET /api/profiles/by_persistent_id?id=...",
+            "GET /api/profiles/by_gpm?id=...",
+        ],
+        "prewarm": [
+            "POST /api/prewarm/events with Gerrit ref-updated event(s)",
+            "POST /api/prewarm/poll",
+            "GET /api/prewarm/status",
+        ],
     }
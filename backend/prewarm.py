@@ -0,0 +1,167 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from gerrit_client import GerritClient
+
+TAG_REF_PREFIX = "refs/tags/"
+NULL_REVISION = "0" * 40
+
+
+# ---------------------------
+# Resolution cache
+# ---------------------------
+class ResolutionCache:
+    """Thread-safe TTL cache for resolved Gerrit URLs and Artifactory lookups.
+
+    Keys are tuples, e.g. ("gerrit", project, tag) or ("artifact", name, sw_version).
+    Only successful lookups should be stored, so a tag or artifact that shows up
+    later is not hidden behind a cached miss. Keys are typically used for one
+    release only, so expired entries are swept periodically on set().
+    """
+
+    PURGE_INTERVAL = 60.0
+
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = ttl
+        self._data: Dict[Tuple, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._next_purge = time.time() + self.PURGE_INTERVAL
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.time():
+                self._data.pop(key, None)
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Tuple, value: Any) -> None:
+        with self._lock:
+            now = time.time()
+            if now >= self._next_purge:
+                self._purge(now)
+            self._data[key] = (now + self.ttl, value)
+
+    def _purge(self, now: float) -> None:
+        for key in [k for k, (expires, _) in self._data.items() if expires < now]:
+            del self._data[key]
+        self._next_purge = now + self.PURGE_INTERVAL
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._purge(time.time())
+            return {"entries": len(self._data), "hits": self.hits, "misses": self.misses, "ttl": self.ttl}
+
+
+# ---------------------------
+# Tag events
+# ---------------------------
+def parse_ref_updated_event(event: Dict) -> Optional[Tuple[str, str]]:
+    """
+    Gerrit stream-events / webhook 'ref-updated' payload -> (project, tag_name).
+    Returns None for anything that is not a newly created or moved tag.
+
+    Example event:
+      {"type": "ref-updated",
+       "refUpdate": {"project": "SWComponents/LevelingControl",
+                     "refName": "refs/tags/BSW_VCC_20.0.1",
+                     "oldRev": "0000000000000000000000000000000000000000",
+                     "newRev": "a1b2c3..."}}
+    """
+    if not isinstance(event, dict) or event.get("type") != "ref-updated":
+        return None
+    upd = event.get("refUpdate") or {}
+    project = (upd.get("project") or "").strip()
+    ref_name = upd.get("refName") or ""
+    if not project or not ref_name.startswith(TAG_REF_PREFIX):
+        return None
+    if upd.get("newRev") == NULL_REVISION:
+        return None  # tag deleted
+    return project, ref_name[len(TAG_REF_PREFIX):]
+
+
+class TagPoller:
+    """
+    Periodically lists tags of the watched Gerrit projects and calls
+    on_new_tag(project, tag) for every tag that was not there on the previous poll.
+    The first poll of a project only records the existing tags.
+    """
+
+    def __init__(
+        self,
+        list_projects: Callable[[], Iterable[str]],
+        on_new_tag: Callable[[str, str], None],
+        interval: float,
+        tag_prefix: str = "",
+        client_factory: Callable[[], GerritClient] = GerritClient,
+    ):
+        self.list_projects = list_projects
+        self.on_new_tag = on_new_tag
+        self.interval = interval
+        self.tag_prefix = tag_prefix
+        self.client_factory = client_factory
+        self._seen: Dict[str, Set[str]] = {}
+        self._seen_lock = threading.Lock()  # the HTTP endpoint and the thread may poll concurrently
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def diff_once(self) -> List[Tuple[str, str]]:
+        """List tags and return the (project, tag) pairs that are new since the last poll."""
+        with self._seen_lock:
+            g = self.client_factory()
+            new_tags: List[Tuple[str, str]] = []
+            for project in sorted(set(self.list_projects())):
+                try:
+                    tags = g.list_tags(project)
+                except Exception as e:
+                    print(f"[prewarm] list_tags {project}: {e}")
+                    continue
+                names = {
+                    t["ref"][len(TAG_REF_PREFIX):]
+                    for t in tags
+                    if (t.get("ref") or "").startswith(TAG_REF_PREFIX)
+                }
+                names = {n for n in names if n.startswith(self.tag_prefix)}
+                previous = self._seen.get(project)
+                self._seen[project] = names
+                if previous is None:
+                    continue
+                new_tags.extend((project, n) for n in sorted(names - previous))
+            return new_tags
+
+    def poll_once(self) -> List[Tuple[str, str]]:
+        """diff_once() and call on_new_tag for every new tag."""
+        new_tags = self.diff_once()
+        for project, tag in new_tags:
+            try:
+                self.on_new_tag(project, tag)
+            except Exception as e:
+                print(f"[prewarm] {project}@{tag}: {e}")
+        return new_tags
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                # e.g. profiles.json unreadable; keep the thread alive and retry next cycle
+                print(f"[prewarm] poll failed: {e}")
+            self._stop.wait(self.interval)
+
+    def is_alive(self) -> bool:
+        return bool(self._thread and self._thread.is_alive())
+
+    def start(self) -> None:
+        if self.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="gerrit-tag-poller", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
@@ -0,0 +1,163 @@
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Indexed fields -> human readable name (used in error messages)
+INDEX_FIELDS = {
+    "project": "Gerrit project",
+    "component_id": "CarWeaver component id",
+    "persistent_id": "CarWeaver persistent id",
+    "gpm_id": "Generic product module id",
+}
+
+
+def _dicts(value) -> List[Dict]:
+    """Entries of a list field that are objects; anything malformed is skipped."""
+    return [v for v in value if isinstance(v, dict)] if isinstance(value, list) else []
+
+
+def _str(value) -> str:
+    return value.strip() if isinstance(value, str) else ""
+
+
+def profile_projects(profile: Dict) -> Set[str]:
+    """All Gerrit projects a profile resolves during generation (same inheritance as generate_swlm)."""
+    projects: Set[str] = set()
+    if not isinstance(profile, dict):
+        return projects
+    for ref in _dicts(profile.get("source_references")):
+        base_project = _str(ref.get("location"))
+        if base_project:
+            projects.add(base_project)
+        for ai in _dicts(ref.get("additional_information")):
+            ai_project = _str(ai.get("location")) or base_project
+            if ai_project:
+                projects.add(ai_project)
+        cl = ref.get("change_log")
+        cl_project = (_str(cl.get("location")) if isinstance(cl, dict) else "") or base_project
+        if cl_project:
+            projects.add(cl_project)
+    return projects
+
+
+def index_keys(profile: Dict) -> Set[Tuple[str, str]]:
+    """(field, value) pairs a profile is reachable by."""
+    keys: Set[Tuple[str, str]] = {("project", p) for p in profile_projects(profile)}
+    if not isinstance(profile, dict):
+        return keys
+    for ref in _dicts(profile.get("source_references")):
+        for comp in _dicts(ref.get("components")):
+            cid = str(comp.get("id") or "").strip()
+            pid = str(comp.get("persistent_id") or "").strip()
+            if cid and cid != "Not found":
+                keys.add(("component_id", cid))
+            if pid and pid != "Not found":
+                keys.add(("persistent_id", pid))
+    gpm = profile.get("generic_product_module")
+    gpm_id = str(gpm.get("id") or "").strip() if isinstance(gpm, dict) else ""
+    if gpm_id and gpm_id != "Not found":
+        keys.add(("gpm_id", gpm_id))
+    return keys
+
+
+class ProfileIndex:
+    """
+    Inverted index (field, value) -> sw_package_ids over the profile store.
+
+    Writes go through upsert()/remove() so the index is kept up to date incrementally.
+    If the profile file was changed behind our back (mtime/size differ from the last
+    write we saw), the next query rebuilds the index from scratch.
+    """
+
+    def __init__(self, path: str, loader: Callable[[], List[Dict]]):
+        self.path = path
+        self.loader = loader
+        self._lock = threading.RLock()
+        self._postings: Dict[Tuple[str, str], Set[str]] = {}
+        self._keys: Dict[str, Set[Tuple[str, str]]] = {}
+        self._summaries: Dict[str, Dict] = {}
+        self._file_sig: Optional[Tuple[int, int]] = None
+
+    # ---- file tracking ----
+    def _current_sig(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def is_fresh(self) -> bool:
+        with self._lock:
+            return self._file_sig is not None and self._file_sig == self._current_sig()
+
+    def mark_synced(self) -> None:
+        """Call right after writing the file, when the index reflects the written content."""
+        with self._lock:
+            self._file_sig = self._current_sig()
+
+    def invalidate(self) -> None:
+        """Force a rebuild on the next query (e.g. after a failed write)."""
+        with self._lock:
+            self._file_sig = None
+
+    def ensure_fresh(self) -> None:
+        with self._lock:
+            if not self.is_fresh():
+                self.rebuild(self.loader())
+
+    # ---- updates ----
+    def rebuild(self, profiles: Iterable[Dict]) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._keys.clear()
+            self._summaries.clear()
+            for p in profiles:
+                if isinstance(p, dict):
+                    self._add(p)
+            self._file_sig = self._current_sig()
+
+    def upsert(self, profile: Dict) -> None:
+        with self._lock:
+            self._add(profile)
+
+    def remove(self, sw_package_id) -> None:
+        with self._lock:
+            self._drop(str(sw_package_id))
+
+    def _add(self, profile: Dict) -> None:
+        pid = str(profile.get("sw_package_id"))
+        self._drop(pid)  # duplicate ids: last one wins, no orphaned postings
+        keys = index_keys(profile)
+        self._keys[pid] = keys
+        self._summaries[pid] = {
+            "sw_package_id": profile.get("sw_package_id"),
+            "profile_name": profile.get("profile_name") or "",
+        }
+        for key in keys:
+            self._postings.setdefault(key, set()).add(pid)
+
+    def _drop(self, pid: str) -> None:
+        for key in self._keys.pop(pid, set()):
+            ids = self._postings.get(key)
+            if ids is None:
+                continue
+            ids.discard(pid)
+            if not ids:
+                del self._postings[key]
+        self._summaries.pop(pid, None)
+
+    # ---- queries ----
+    def lookup_ids(self, field: str, value: str) -> List[str]:
+        self.ensure_fresh()
+        with self._lock:
+            return sorted(self._postings.get((field, value.strip()), set()))
+
+    def lookup(self, field: str, value: str) -> List[Dict]:
+        ids = self.lookup_ids(field, value)
+        with self._lock:
+            return [self._summaries[i] for i in ids if i in self._summaries]
+
+    def values(self, field: str) -> List[str]:
+        self.ensure_fresh()
+        with self._lock:
+            return sorted(v for f, v in self._postings if f == field)
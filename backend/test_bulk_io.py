@@ -0,0 +1,219 @@
+import json
+import os
+
+import pytest
+
+import bulk_io
+from bulk_io import (
+    JsonStreamParser,
+    ProfileSpool,
+    iter_json_array_text,
+    iter_json_file,
+    iter_json_snapshot,
+    merge_profiles,
+    replace_file,
+    validate_profile,
+)
+
+
+def _parse(chunks):
+    parser = JsonStreamParser()
+    values = []
+    for chunk in chunks:
+        values += parser.feed(chunk)
+    return values + parser.close()
+
+
+# ---------------------------
+# JsonStreamParser
+# ---------------------------
+def test_scalar_split_across_chunks():
+    assert _parse([b"[1", b"23]"]) == [123]
+    assert _parse([b"[tr", b"ue, 4", b"5]"]) == [True, 45]
+    assert _parse([b'[{"a": -1.', b'5e', b'3}]']) == [{"a": -1500.0}]
+    assert _parse([b'["\\u00', b'e4"]']) == ["\u00e4"]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_array_every_chunk_boundary(size):
+    data = json.dumps([{"sw_package_id": i, "name": f"p{i}"} for i in range(5)]).encode()
+    chunks = [data[i : i + size] for i in range(0, len(data), size)]
+    assert _parse(chunks) == json.loads(data)
+
+
+def test_multibyte_utf8_split_across_chunks():
+    data = json.dumps([{"name": "Luftfjädring ÅÄÖ €"}], ensure_ascii=False).encode("utf-8")
+    split = data.index("€".encode("utf-8")) + 1  # inside the 3-byte sequence
+    assert _parse([data[:split], data[split:]]) == [{"name": "Luftfjädring ÅÄÖ €"}]
+
+
+def test_ndjson_lines_and_blank_lines():
+    assert _parse([b'{"a": 1}\n\n{"b"', b": 2}\n", b'{"c": 3}']) == [{"a": 1}, {"b": 2}, {"c": 3}]
+
+
+def test_ndjson_bad_line_reports_line_number():
+    with pytest.raises(ValueError, match="line 2"):
+        _parse([b'{"a": 1}\n{bad\n'])
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        b'[{"a": 1} {"b": 2}]',  # missing separator
+        b'[,{"a": 1}]',  # leading comma
+        b'[{"a": 1},,{"b": 2}]',  # empty item
+        b'[{"a": 1},]',  # trailing comma
+        b'[{"a": 1}',  # unterminated
+        b'[{"a": 1}] x',  # trailing garbage
+    ],
+)
+def test_malformed_array_separators(data):
+    with pytest.raises(ValueError):
+        _parse([data])
+
+
+def test_invalid_item_fails_before_rest_is_buffered():
+    parser = JsonStreamParser()
+    assert parser.feed(b'[{"a": 1}, ') == [{"a": 1}]
+    with pytest.raises(ValueError, match="item 2"):
+        parser.feed(b'{bad: 1}, ' + b'{"a": 1}, ' * 1000)
+
+
+def test_pending_item_is_capped():
+    parser = JsonStreamParser(max_item_size=100)
+    parser.feed(b'[{"a": "')
+    with pytest.raises(ValueError, match="exceeds"):
+        parser.feed(b"x" * 200)
+
+    parser = JsonStreamParser(max_item_size=100)
+    with pytest.raises(ValueError, match="exceeds"):
+        parser.feed(b'{"a": "' + b"x" * 200)  # NDJSON line without newline
+
+
+def test_empty_array():
+    assert _parse([b" [ ] "]) == []
+
+
+# ---------------------------
+# Output / merge
+# ---------------------------
+def test_array_text_matches_json_dump():
+    items = [{"sw_package_id": 1, "nested": {"x": [1, 2]}}, {"sw_package_id": 2}]
+    assert "".join(iter_json_array_text(items)) == json.dumps(items, indent=2, ensure_ascii=False)
+    assert "".join(iter_json_array_text([])) == json.dumps([], indent=2)
+
+
+def _store(tmp_path, profiles):
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps(profiles, indent=2), encoding="utf-8")
+    return str(path)
+
+
+def _spool(profiles):
+    spool = ProfileSpool()
+    for i, p in enumerate(profiles, 1):
+        spool.add(p, i)
+    return spool
+
+
+def test_merge_diff_created_updated_unchanged(tmp_path):
+    path = _store(tmp_path, [
+        {"sw_package_id": 1, "profile_name": "A"},
+        {"sw_package_id": 2, "profile_name": "B"},
+        {"sw_package_id": 3, "profile_name": "C"},
+    ])
+    spool = _spool([
+        {"sw_package_id": 2, "profile_name": "B2"},
+        {"sw_package_id": 3, "profile_name": "C"},
+        {"sw_package_id": 4, "profile_name": "D"},
+    ])
+    before = open(path, encoding="utf-8").read()
+
+    dry = merge_profiles(path, spool, dry_run=True)
+    assert open(path, encoding="utf-8").read() == before
+    assert dry["created"] == [4]
+    assert dry["updated"] == [{"sw_package_id": 2, "changed_fields": ["profile_name"]}]
+    assert dry["unchanged"] == [3]
+
+    summary = merge_profiles(path, spool)
+    spool.close()
+    assert {k: summary[k] for k in ("created", "updated", "unchanged")} == {k: dry[k] for k in ("created", "updated", "unchanged")}
+    assert list(iter_json_file(path)) == [
+        {"sw_package_id": 1, "profile_name": "A"},
+        {"sw_package_id": 2, "profile_name": "B2"},
+        {"sw_package_id": 3, "profile_name": "C"},
+        {"sw_package_id": 4, "profile_name": "D"},
+    ]
+    assert not (tmp_path / "profiles.json.bulk.tmp").exists()
+
+
+def test_spool_rejects_invalid_and_keeps_last_duplicate():
+    spool = _spool([
+        {"profile_name": "no id"},
+        [1, 2],
+        {"sw_package_id": 7, "profile_name": "first"},
+        {"sw_package_id": 7, "profile_name": "last"},
+    ])
+    assert spool.error_count == 2
+    assert [e["item"] for e in spool.errors] == [1, 2]
+    assert spool.get("7")["profile_name"] == "last"
+    spool.close()
+
+
+@pytest.mark.parametrize(
+    "profile, error",
+    [
+        ({"sw_package_id": 1, "source_references": ["x"]}, "source_references[0] must be an object"),
+        ({"sw_package_id": 1, "source_references": [{"components": ["c"]}]}, "source_references[0].components[0]"),
+        ({"sw_package_id": 1, "source_references": [{"additional_information": "x"}]}, "must be a list"),
+        ({"sw_package_id": 1, "source_references": [{"change_log": "x"}]}, "change_log must be an object"),
+        ({"sw_package_id": 1, "generic_product_module": "GPM-9"}, "generic_product_module must be an object"),
+        ({"sw_package_id": 1, "artifacts": ["SUM SWLM"]}, "artifacts[0] must be an object"),
+    ],
+)
+def test_validate_nested_shapes(profile, error):
+    assert error in validate_profile(profile)
+
+
+def test_validate_accepts_sample_profiles():
+    path = os.path.join(os.path.dirname(__file__), "profiles.json")
+    assert all(validate_profile(p) is None for p in iter_json_file(path))
+
+
+def test_snapshot_reads_a_copy(tmp_path):
+    path = _store(tmp_path, [{"sw_package_id": 1}, {"sw_package_id": 2}])
+    items = iter_json_snapshot(path)
+    assert next(items) == {"sw_package_id": 1}
+    newer = tmp_path / "newer.json"
+    newer.write_text(json.dumps([{"sw_package_id": 3}]), encoding="utf-8")
+    os.replace(newer, path)  # store swapped mid-read
+    assert list(items) == [{"sw_package_id": 2}]
+
+
+def test_failed_replace_removes_temp_file(tmp_path, monkeypatch):
+    tmp = tmp_path / "profiles.json.tmp"
+    tmp.write_text("[]")
+
+    def locked(src, dst):
+        raise PermissionError("in use")
+
+    monkeypatch.setattr(bulk_io.os, "replace", locked)
+    with pytest.raises(PermissionError):
+        replace_file(str(tmp), str(tmp_path / "profiles.json"), retries=2, delay=0)
+    assert not tmp.exists()
+
+
+def test_merge_failure_leaves_store_and_no_temp_file(tmp_path, monkeypatch):
+    path = _store(tmp_path, [{"sw_package_id": 1}])
+    before = open(path, encoding="utf-8").read()
+    spool = _spool([{"sw_package_id": 2}])
+
+    def disk_full(fd):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(bulk_io.os, "fsync", disk_full)
+    with pytest.raises(OSError):
+        merge_profiles(path, spool)
+    spool.close()
+    assert open(path, encoding="utf-8").read() == before
+    assert not (tmp_path / "profiles.json.bulk.tmp").exists()
@@ -0,0 +1,131 @@
+import threading
+import time
+
+from prewarm import NULL_REVISION, ResolutionCache, TagPoller, parse_ref_updated_event
+
+
+# ---------------------------
+# ResolutionCache
+# ---------------------------
+def test_cache_hit_and_miss():
+    cache = ResolutionCache(ttl=60)
+    assert cache.get(("gerrit", "p", "t")) is None
+    cache.set(("gerrit", "p", "t"), "https://gerrit/p/t")
+    assert cache.get(("gerrit", "p", "t")) == "https://gerrit/p/t"
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_cache_entries_expire():
+    cache = ResolutionCache(ttl=0.01)
+    cache.set(("artifact", "SUM SWLM", "BSW_1"), ("url", "sha"))
+    time.sleep(0.02)
+    assert cache.get(("artifact", "SUM SWLM", "BSW_1")) is None
+
+
+def test_cache_purges_expired_entries_never_read_again():
+    cache = ResolutionCache(ttl=0.01)
+    for i in range(10):
+        cache.set(("gerrit", "p", f"BSW_{i}"), "url")
+    time.sleep(0.02)
+    assert cache.stats()["entries"] == 0
+
+    cache.PURGE_INTERVAL = 0
+    cache.set(("gerrit", "p", "old"), "url")
+    time.sleep(0.02)
+    cache.set(("gerrit", "p", "new"), "url")  # sweeps "old"
+    assert cache.stats()["entries"] == 1
+
+
+# ---------------------------
+# parse_ref_updated_event
+# ---------------------------
+def _event(ref_name, new_rev="a" * 40, type_="ref-updated", project="SWComponents/LevelingControl"):
+    return {"type": type_, "refUpdate": {"project": project, "refName": ref_name, "newRev": new_rev}}
+
+
+def test_parse_tag_created_or_moved():
+    assert parse_ref_updated_event(_event("refs/tags/BSW_VCC_20.0.1")) == (
+        "SWComponents/LevelingControl",
+        "BSW_VCC_20.0.1",
+    )
+
+
+def test_parse_ignores_deleted_tags_branches_and_other_events():
+    assert parse_ref_updated_event(_event("refs/tags/BSW_VCC_20.0.1", new_rev=NULL_REVISION)) is None
+    assert parse_ref_updated_event(_event("refs/heads/master")) is None
+    assert parse_ref_updated_event(_event("refs/tags/BSW_1", type_="patchset-created")) is None
+    assert parse_ref_updated_event(_event("refs/tags/BSW_1", project="")) is None
+    assert parse_ref_updated_event("not an event") is None
+
+
+# ---------------------------
+# TagPoller
+# ---------------------------
+class FakeGerrit:
+    tags = {}
+    fail = set()
+
+    def list_tags(self, project):
+        if project in self.fail:
+            raise Exception("Gerrit API error: 500")
+        return [{"ref": f"refs/tags/{t}"} for t in self.tags.get(project, [])]
+
+
+def _poller(projects, warmed, prefix="BSW_"):
+    FakeGerrit.tags = {}
+    FakeGerrit.fail = set()
+    return TagPoller(lambda: projects, lambda p, t: warmed.append((p, t)), 0.01, prefix, FakeGerrit)
+
+
+def test_first_poll_only_records_existing_tags():
+    warmed = []
+    poller = _poller(["a"], warmed)
+    FakeGerrit.tags = {"a": ["BSW_1", "OTHER_1"]}
+    assert poller.poll_once() == []
+
+    FakeGerrit.tags = {"a": ["BSW_1", "BSW_2", "OTHER_2"]}
+    assert poller.poll_once() == [("a", "BSW_2")]
+    assert warmed == [("a", "BSW_2")]
+    assert poller.poll_once() == []
+
+
+def test_poll_survives_list_tags_and_callback_errors():
+    poller = TagPoller(lambda: ["a", "b"], lambda p, t: 1 / 0, 0.01, "BSW_", FakeGerrit)
+    FakeGerrit.tags = {"a": [], "b": []}
+    FakeGerrit.fail = set()
+    poller.poll_once()
+    FakeGerrit.tags = {"a": ["BSW_1"], "b": ["BSW_1"]}
+    FakeGerrit.fail = {"a"}
+    assert poller.poll_once() == [("b", "BSW_1")]
+
+
+def test_thread_survives_failing_cycles():
+    calls = []
+
+    def broken_projects():
+        calls.append(1)
+        raise ValueError("profiles.json unreadable")
+
+    poller = TagPoller(broken_projects, lambda p, t: None, 0.01, "", FakeGerrit)
+    poller.start()
+    try:
+        time.sleep(0.05)
+        assert poller.is_alive()
+        assert len(calls) > 1
+    finally:
+        poller.stop()
+
+
+def test_concurrent_diffs_report_each_tag_once():
+    warmed = []
+    poller = _poller(["a"], warmed)
+    poller.diff_once()
+    FakeGerrit.tags = {"a": ["BSW_1"]}
+    results = []
+    threads = [threading.Thread(target=lambda: results.extend(poller.diff_once())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [("a", "BSW_1")]
@@ -0,0 +1,104 @@
+import json
+import os
+
+from profile_index import ProfileIndex, index_keys, profile_projects
+
+
+def _profile(pid, project="SWComponents/LevelingControl", component="C-9872", gpm="GPM-2"):
+    return {
+        "sw_package_id": pid,
+        "profile_name": f"P{pid}",
+        "generic_product_module": {"id": gpm},
+        "source_references": [
+            {
+                "location": project,
+                "components": [{"id": component, "persistent_id": "C-23434"}],
+                "additional_information": [{"location": "GenData/SimulinkFunc"}, {"location": ""}],
+                "change_log": {"location": ""},
+            }
+        ],
+    }
+
+
+def _index(tmp_path, profiles):
+    path = tmp_path / "profiles.json"
+    path.write_text(json.dumps(profiles), encoding="utf-8")
+    load = lambda: json.loads(path.read_text(encoding="utf-8"))
+    return path, ProfileIndex(str(path), load)
+
+
+def _write_externally(path, profiles):
+    path.write_text(json.dumps(profiles, indent=4), encoding="utf-8")
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_profile_projects_inherits_base_project():
+    assert profile_projects(_profile(1)) == {"SWComponents/LevelingControl", "GenData/SimulinkFunc"}
+
+
+def test_index_keys():
+    assert index_keys(_profile(1)) == {
+        ("project", "SWComponents/LevelingControl"),
+        ("project", "GenData/SimulinkFunc"),
+        ("component_id", "C-9872"),
+        ("persistent_id", "C-23434"),
+        ("gpm_id", "GPM-2"),
+    }
+
+
+def test_malformed_nested_entries_are_skipped():
+    bad = {
+        "sw_package_id": 9,
+        "generic_product_module": "GPM-9",
+        "source_references": ["x", {"location": "A", "components": ["c", None], "change_log": "x"}],
+    }
+    assert index_keys(bad) == {("project", "A")}
+    assert index_keys({"sw_package_id": 10, "source_references": "x"}) == set()
+
+
+def test_malformed_profile_does_not_break_lookups(tmp_path):
+    _, ix = _index(tmp_path, [_profile(1), {"sw_package_id": 2, "source_references": ["x"], "generic_product_module": "GPM-9"}])
+    assert [p["sw_package_id"] for p in ix.lookup("component_id", "C-9872")] == [1]
+    assert ix.values("gpm_id") == ["GPM-2"]
+
+
+def test_incremental_upsert_and_remove(tmp_path):
+    _, ix = _index(tmp_path, [_profile(1)])
+    assert ix.lookup_ids("gpm_id", "GPM-2") == ["1"]
+
+    ix.upsert(_profile(2, component="C-1"))
+    ix.upsert(_profile(1, gpm="GPM-3"))  # moved to another GPM
+    assert ix.lookup_ids("gpm_id", "GPM-2") == ["2"]
+    assert ix.lookup_ids("gpm_id", "GPM-3") == ["1"]
+    assert ix.lookup_ids("component_id", "C-1") == ["2"]
+
+    ix.remove(2)
+    assert ix.lookup_ids("component_id", "C-1") == []
+    assert ix.values("component_id") == ["C-9872"]
+
+
+def test_duplicate_ids_leave_no_orphans(tmp_path):
+    _, ix = _index(tmp_path, [_profile(1, project="Old/Project"), _profile(1, project="New/Project")])
+    assert ix.lookup_ids("project", "Old/Project") == []
+    assert ix.lookup_ids("project", "New/Project") == ["1"]
+
+    ix.remove(1)
+    assert ix.values("project") == []
+
+
+def test_rebuild_after_external_edit(tmp_path):
+    path, ix = _index(tmp_path, [_profile(1)])
+    assert ix.lookup_ids("gpm_id", "GPM-2") == ["1"]
+
+    _write_externally(path, [_profile(1, gpm="GPM-7"), _profile(5)])
+    assert ix.lookup_ids("gpm_id", "GPM-7") == ["1"]
+    assert ix.lookup_ids("gpm_id", "GPM-2") == ["5"]
+
+
+def test_invalidate_forces_rebuild(tmp_path):
+    _, ix = _index(tmp_path, [_profile(1)])
+    ix.ensure_fresh()
+    ix.upsert(_profile(99))  # never written to the file
+    ix.invalidate()
+    assert ix.lookup_ids("gpm_id", "GPM-2") == ["1"]